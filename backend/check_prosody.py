@@ -0,0 +1,43 @@
+"""
+Sanity checks for the prosody analyser's meter labels.
+
+Run after changing prosody.py heuristics or thresholds:
+
+    python check_prosody.py
+"""
+
+import json
+
+from prosody import analyze_poem
+
+# Whitman, "Song of Myself" (opening): free verse
+FREE_VERSE = """I celebrate myself, and sing myself,
+And what I assume you shall assume,
+For every atom belonging to me as good belongs to you.
+I loafe and invite my soul,
+I lean and loafe at my ease observing a spear of summer grass."""
+
+# Blake, "The Tyger" (opening): trochaic tetrameter
+TROCHAIC = """Tyger Tyger, burning bright,
+In the forests of the night;
+What immortal hand or eye,
+Could frame thy fearful symmetry?"""
+
+with open("poems.json", "r") as f:
+    poems = {poem["id"]: poem for poem in json.load(f)}
+
+checks = [
+    ("Whitman free verse", analyze_poem(FREE_VERSE)["meter"], lambda m: m.startswith("irregular")),
+    ("Blake trochaic tetrameter", analyze_poem(TROCHAIC)["meter"], lambda m: m == "trochaic tetrameter"),
+    # Dialect free verse; an exact meter label here would mislead the generation prompt
+    ("#1 Tribute to a 'Subber Code'", analyze_poem(poems[1]["content"])["meter"], lambda m: m.startswith("irregular")),
+]
+
+failed = False
+for name, meter, ok in checks:
+    status = "ok" if ok(meter) else "FAIL"
+    failed = failed or status == "FAIL"
+    print(f"{status}: {name} -> {meter}")
+
+if failed:
+    raise SystemExit(1)
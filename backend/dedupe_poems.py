@@ -0,0 +1,234 @@
+"""
+Near-duplicate detection and compaction for the poem corpus.
+
+Poems are reduced to MinHash signatures over character shingles, and
+locality-sensitive hashing (LSH) buckets the signatures by band so only poems
+sharing a bucket are compared. Candidate pairs are verified together in numpy,
+then grouped into clusters.
+
+Report duplicate clusters in poems.json:
+
+    python dedupe_poems.py
+
+Drop duplicates from poems.json and poems_with_embeddings.json in place,
+keeping the lowest id in each cluster (ids are never renumbered):
+
+    python dedupe_poems.py --compact
+
+Dropped ids are appended to retired_poem_ids.json beside the store so
+save_user_poem never hands them out again (images and links are keyed by id).
+The index and retired-id file default to the store's directory, so the script
+can be run from anywhere:
+
+    python backend/dedupe_poems.py --input backend/poems.json --compact
+
+A running server keeps its stale SAMPLE_POEMS, EMBEDDING_VECTORS and
+SEARCH_INDEX until it is restarted.
+"""
+
+import argparse
+import json
+import os
+import re
+import tempfile
+import zlib
+from typing import Dict, List, Set
+
+import numpy as np
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 128
+# 32 bands of 4 rows catch pairs down to roughly (1/32) ** (1/4) ~ 0.42 similarity,
+# comfortably below the verification threshold so true duplicates aren't missed
+NUM_BANDS = 32
+DEFAULT_THRESHOLD = 0.8
+SEED = 42
+RETIRED_IDS_FILE = "retired_poem_ids.json"
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip punctuation so formatting differences don't matter"""
+    text = re.sub(r"[^a-z0-9\s]", "", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def poem_text(poem: dict) -> str:
+    return normalize(f"{poem['title']} {poem['content']}")
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """Hash every character shingle of a text to a 32-bit integer"""
+    if len(text) < SHINGLE_SIZE:
+        text = text.ljust(SHINGLE_SIZE)
+    shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64)
+
+
+def minhash_signatures(texts: List[str]) -> np.ndarray:
+    """
+    Build an (n_poems, NUM_PERMUTATIONS) matrix of MinHash signatures.
+
+    Each permutation is a multiply-shift hash; uint64 overflow wraps, which is
+    what the scheme relies on.
+    """
+    rng = np.random.default_rng(SEED)
+    multipliers = rng.integers(1, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+    offsets = rng.integers(0, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64)
+    signatures = np.empty((len(texts), NUM_PERMUTATIONS), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for row, text in enumerate(texts):
+            hashes = shingle_hashes(text)
+            permuted = (multipliers[:, None] * hashes[None, :] + offsets[:, None]) >> np.uint64(32)
+            signatures[row] = permuted.min(axis=1)
+    return signatures
+
+
+def candidate_pairs(signatures: np.ndarray) -> np.ndarray:
+    """Return (n_pairs, 2) index pairs of poems sharing at least one LSH band bucket"""
+    n_poems = signatures.shape[0]
+    rows_per_band = NUM_PERMUTATIONS // NUM_BANDS
+    bands = signatures[:, :NUM_BANDS * rows_per_band].reshape(n_poems, NUM_BANDS, rows_per_band)
+    pairs = []
+    for band in range(NUM_BANDS):
+        # Rows with identical band values share a bucket id
+        _, buckets = np.unique(bands[:, band, :], axis=0, return_inverse=True)
+        buckets = buckets.ravel()
+        order = np.argsort(buckets, kind="stable")
+        sorted_buckets = buckets[order]
+        starts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+        sizes = np.diff(np.r_[starts, n_poems])
+        for start, size in zip(starts[sizes > 1], sizes[sizes > 1]):
+            members = order[start:start + size]
+            left, right = np.triu_indices(size, k=1)
+            pairs.append(np.stack([members[left], members[right]], axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(pairs), axis=1)
+    return np.unique(pairs, axis=0)
+
+
+def find_clusters(poems: List[dict], threshold: float = DEFAULT_THRESHOLD) -> List[List[dict]]:
+    """
+    Group near-duplicate poems.
+
+    Returns clusters of two or more poems ordered by id, each entry carrying the
+    poem's id, title and estimated similarity to the cluster's first poem.
+    """
+    if len(poems) < 2:
+        return []
+    signatures = minhash_signatures([poem_text(poem) for poem in poems])
+    pairs = candidate_pairs(signatures)
+    if len(pairs) == 0:
+        return []
+    similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    pairs = pairs[similarity >= threshold]
+
+    # Cluster around each keeper using only pairs verified against that keeper,
+    # so similarity never chains (A~B, B~C does not pull in C unless A~C)
+    neighbours: Dict[int, Dict[int, float]] = {}
+    for (a, b), score in zip(pairs.tolist(), similarity[similarity >= threshold].tolist()):
+        neighbours.setdefault(a, {})[b] = score
+        neighbours.setdefault(b, {})[a] = score
+
+    assigned: Set[int] = set()
+    clusters = []
+    for keeper in sorted(neighbours, key=lambda i: poems[i]["id"]):
+        if keeper in assigned:
+            continue
+        members = [i for i in neighbours[keeper] if i not in assigned]
+        if not members:
+            continue
+        members.sort(key=lambda i: poems[i]["id"])
+        assigned.update(members)
+        assigned.add(keeper)
+        cluster = [{"id": poems[keeper]["id"], "title": poems[keeper]["title"], "similarity": 1.0}]
+        cluster.extend(
+            {"id": poems[i]["id"], "title": poems[i]["title"], "similarity": neighbours[keeper][i]}
+            for i in members
+        )
+        clusters.append(cluster)
+    return clusters
+
+
+def write_json_atomic(path: str, data, indent=None):
+    """Write JSON to a temp file beside path, then swap it in so a crash can't truncate the original"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=indent)
+        # mkstemp creates files owner-only; keep the original file's permissions
+        os.chmod(tmp_path, os.stat(path).st_mode if os.path.exists(path) else 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def compact_file(path: str, drop_ids: set) -> int:
+    """Remove poems with the given ids from a JSON file in place, returning how many were dropped"""
+    with open(path, "r") as f:
+        poems = json.load(f)
+    kept = [poem for poem in poems if poem["id"] not in drop_ids]
+    indent = None if path.endswith("poems_with_embeddings.json") else 2
+    write_json_atomic(path, kept, indent)
+    return len(poems) - len(kept)
+
+
+def retire_ids(drop_ids: set, path: str = RETIRED_IDS_FILE):
+    """Record removed ids so new poems are never assigned them"""
+    try:
+        with open(path, "r") as f:
+            retired = set(json.load(f))
+    except FileNotFoundError:
+        retired = set()
+    write_json_atomic(path, sorted(retired | drop_ids), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and remove near-duplicate poems")
+    parser.add_argument("--input", default="poems.json", help="Poem store to scan")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Minimum estimated Jaccard similarity to count as a duplicate")
+    parser.add_argument("--compact", action="store_true",
+                        help="Rewrite the store and embedding index without duplicates")
+    parser.add_argument("--index", default=None,
+                        help="Embedding index to compact alongside the store "
+                             "(default: poems_with_embeddings.json beside --input)")
+    parser.add_argument("--retired", default=None,
+                        help=f"File recording removed ids (default: {RETIRED_IDS_FILE} beside --input)")
+    args = parser.parse_args()
+    # Resolve companions relative to the store, where main.py reads them, not the cwd
+    store_dir = os.path.dirname(args.input)
+    index_path = args.index or os.path.join(store_dir, "poems_with_embeddings.json")
+    retired_path = args.retired or os.path.join(store_dir, RETIRED_IDS_FILE)
+
+    with open(args.input, "r") as f:
+        poems = json.load(f)
+
+    clusters = find_clusters(poems, args.threshold)
+    if not clusters:
+        print(f"No near-duplicates found among {len(poems)} poems.")
+        return
+
+    for cluster in clusters:
+        keeper = cluster[0]
+        print(f"#{keeper['id']} {keeper['title']}")
+        for dup in cluster[1:]:
+            print(f"    #{dup['id']} {dup['title']} (similarity {dup['similarity']:.2f})")
+    drop_ids = {dup["id"] for cluster in clusters for dup in cluster[1:]}
+    print(f"\n{len(clusters)} clusters, {len(drop_ids)} duplicates among {len(poems)} poems.")
+
+    if args.compact:
+        # Retire ids first: if compaction is interrupted, ids are reserved rather than reused
+        retire_ids(drop_ids, retired_path)
+        print(f"Retired {len(drop_ids)} ids in {retired_path}")
+        for path in (args.input, index_path):
+            if os.path.exists(path):
+                removed = compact_file(path, drop_ids)
+                print(f"Removed {removed} poems from {path}")
+        print("Restart the API server to reload poems, embeddings and the search index.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import json
 import os
 from dotenv import load_dotenv
 from tqdm import tqdm
+from prosody import analyze_poem
 
 load_dotenv()
 client = OpenAI()
@@ -22,6 +23,7 @@ def get_embedding(text):
 for poem in tqdm(poems):
     full_text = f"{poem['title']}\n{poem['content']}\n{poem['signature']}"
     poem["embedding"] = get_embedding(full_text)
+    poem["prosody"] = analyze_poem(poem["content"])
 
 with open("poems_with_embeddings.json", "w") as f:
     json.dump(poems, f)
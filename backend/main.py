@@ -1,5 +1,6 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
@@ -9,7 +10,12 @@ from openai import OpenAI
 from openai.types.chat import ChatCompletionMessageParam
 from dotenv import load_dotenv
 import uuid
+import asyncio
+import threading
+import time
 from datetime import datetime
+from prosody import analyze_poem, format_fingerprint
+from poem_search import PoemSearchIndex
 
 # Load environment variables from .env file
 load_dotenv()
@@ -30,9 +36,21 @@ app.add_middleware(
 with open("poems_with_embeddings.json", "r") as f:
     SAMPLE_POEMS = json.load(f)
 
+# Fingerprints are normally computed by embed_poems.py; cover files built before that
+for poem in SAMPLE_POEMS:
+    if "prosody" not in poem:
+        poem["prosody"] = analyze_poem(poem["content"])
+
 # Extract all embedding vectors into a matrix for cosine similarity
 EMBEDDING_VECTORS = np.array([poem["embedding"] for poem in SAMPLE_POEMS])
 
+# Title/signature/content search and id lookup over the archive, kept in sync by save_user_poem
+try:
+    with open("poems.json", "r") as f:
+        SEARCH_INDEX = PoemSearchIndex(json.load(f))
+except FileNotFoundError:
+    SEARCH_INDEX = PoemSearchIndex([])
+
 client = OpenAI()
 
 class GenerateRequest(BaseModel):
@@ -54,9 +72,63 @@ class GenerateResponse(BaseModel):
     illustration_url: Optional[str] = None
     poem_id: Optional[str] = None
 
+class SearchHit(BaseModel):
+    id: int
+    title: str
+
+class SearchResponse(BaseModel):
+    query: str
+    total: int
+    hits: List[SearchHit]
+
 # In-memory cache of illustrations keyed by poem ID
 ILLUSTRATION_CACHE = {}
 
+# Progress events for each illustration job, keyed by poem ID, plus the
+# (event loop, queue) pairs of clients currently streaming that job.
+# The background job runs in a worker thread, so both are guarded by a lock.
+ILLUSTRATION_EVENTS = {}
+ILLUSTRATION_SUBSCRIBERS = {}
+ILLUSTRATION_LOCK = threading.Lock()
+
+# When each job published its terminal event, in publish order, so finished
+# histories can be dropped once nobody is likely to open a stream for them
+ILLUSTRATION_FINISHED = {}
+
+# Events after which an illustration job has nothing more to report
+TERMINAL_ILLUSTRATION_EVENTS = {"ready", "failed"}
+
+# Seconds a finished job's event history is kept; later streams replay from ILLUSTRATION_CACHE
+ILLUSTRATION_EVENT_TTL_SECONDS = 600
+
+# Seconds between keep-alive comments on an idle illustration stream
+ILLUSTRATION_KEEPALIVE_SECONDS = 15
+
+def publish_illustration_event(pid: str, event: str, data: Optional[dict] = None):
+    """Record a progress event for an illustration job and push it to every waiting client.
+
+    Safe to call from the background worker thread: delivery is handed to each
+    subscriber's event loop with call_soon_threadsafe.
+    """
+    message = {"event": event, "data": data or {}}
+    now = time.monotonic()
+    with ILLUSTRATION_LOCK:
+        # Evict expired histories; ILLUSTRATION_FINISHED is ordered oldest first
+        for finished_pid, finished_at in list(ILLUSTRATION_FINISHED.items()):
+            if now - finished_at < ILLUSTRATION_EVENT_TTL_SECONDS:
+                break
+            del ILLUSTRATION_FINISHED[finished_pid]
+            ILLUSTRATION_EVENTS.pop(finished_pid, None)
+        ILLUSTRATION_EVENTS.setdefault(pid, []).append(message)
+        if event in TERMINAL_ILLUSTRATION_EVENTS:
+            ILLUSTRATION_FINISHED[pid] = now
+        subscribers = list(ILLUSTRATION_SUBSCRIBERS.get(pid, ()))
+    for loop, queue in subscribers:
+        loop.call_soon_threadsafe(queue.put_nowait, message)
+
+def format_sse(message: dict) -> str:
+    return f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+
 def find_similar_poems(prompt: str, top_k: int = 3) -> List[dict]:
     response = client.embeddings.create(
         model="text-embedding-3-small",
@@ -73,6 +145,7 @@ def find_similar_poems(prompt: str, top_k: int = 3) -> List[dict]:
             "title": poem["title"],
             "content": poem["content"],
             "signature": poem["signature"],
+            "prosody": poem["prosody"],
             "score": float(similarities[idx])
         })
     return similar_poems
@@ -89,7 +162,7 @@ def generate_poem_with_openai(prompt: str, similar_poems: List[str]) -> dict:
                 "Your tone is conversational, self-deprecating, observational, and moral, with a wry or bittersweet undercurrent. "
                 "You frequently write in formal rhyme and meter."
                 "You often adopt parodic or whimsical variations of established forms of poetry. "
-                "You analyze and reflect on your rhythm before writing. "
+                "You keep a steady, deliberate rhythm and rhyme. "
                 "Your poems ALWAYS end with a humorous biographical signature related to the poem in the form '(J.D. Evans, a pseudonym, is [statement related to poem] … occasionally)'. "
                 "Always sign your poems with a version of this line. "
                 "Generate poems in this style—playful, reflective, and rhythmically engaging—grounded in the ordinary absurdities of American life."
@@ -103,9 +176,9 @@ def generate_poem_with_openai(prompt: str, similar_poems: List[str]) -> dict:
                 f"Write a poem inspired by the following theme: {prompt}.\n\n"
                 f"Here are a few past poems for style and rhythm inspiration:\n\n" +
                 "\n\n---\n\n".join(similar_poems) +
-                "\n\nFirst, analyze the rhythm of each past poem by writing the perceived stress pattern of each line using 'U' for unstressed and '/' for stressed syllables. "
-                "Choose one poem you have the most confidence in and use its metrical fingerprint (U and /) to guide the rhythm of your new poem. When in doubt use anapestic tetrameter."
-                "Then, write a new poem that matches or mirrors the rhythm and rhyme pattern.\n\n"
+                "\n\nEach past poem is followed by its metrical fingerprint: meter, rhyme scheme, and the stress pattern of each line using 'U' for unstressed and '/' for stressed syllables. "
+                "Choose one poem you have the most confidence in and use its metrical fingerprint to guide the rhythm of your new poem. When in doubt use anapestic tetrameter. "
+                "Do not write out any analysis. Write a new poem that matches or mirrors the rhythm and rhyme pattern.\n\n"
                 "Return the result as a JSON object with the following fields:\n"
                 "{\n"
                 '  "title": "The title of the poem",\n'
@@ -168,10 +241,15 @@ def save_user_poem(poem_data: dict, prompt: str):
     try:
         with open("poems.json", "r") as f:
             poems = json.load(f)
-        next_id = max(poem["id"] for poem in poems) + 1 if poems else 1
     except FileNotFoundError:
         poems = []
-        next_id = 1
+    # Ids removed by dedupe_poems.py --compact are never reused, so skip past them too
+    try:
+        with open("retired_poem_ids.json", "r") as f:
+            retired_ids = json.load(f)
+    except FileNotFoundError:
+        retired_ids = []
+    next_id = max([poem["id"] for poem in poems] + retired_ids + [0]) + 1
 
     user_poem = {
         "id": next_id,
@@ -186,11 +264,13 @@ def save_user_poem(poem_data: dict, prompt: str):
     with open("poems.json", "w") as f:
         json.dump(poems, f, indent=2)
 
+    SEARCH_INDEX.add(user_poem)
+
 @app.post("/generate", response_model=GenerateResponse)
 async def generate_poem(request: GenerateRequest, background_tasks: BackgroundTasks):
     similar_poems = find_similar_poems(request.prompt)
     similar_poem_texts = [
-        f"{poem['title']}\n{poem['content']}\n{poem['signature']}"
+        f"{poem['title']}\n{poem['content']}\n{poem['signature']}\n\n{format_fingerprint(poem['prosody'])}"
         for poem in similar_poems
     ]
     poem_data = generate_poem_with_openai(request.prompt, similar_poem_texts)
@@ -199,21 +279,29 @@ async def generate_poem(request: GenerateRequest, background_tasks: BackgroundTa
     def background_image_generation(poem_body, pid):
         try:
             visual_prompt = extract_visual_prompt(poem_body)
+            publish_illustration_event(pid, "visual_prompt", {"illustration_prompt": visual_prompt})
             full_prompt = combine_with_style(visual_prompt)
             illustration_url = generate_illustration(full_prompt)
             ILLUSTRATION_CACHE[pid] = {
                 "illustration_prompt": visual_prompt,
                 "illustration_url": illustration_url
             }
+            publish_illustration_event(pid, "ready", ILLUSTRATION_CACHE[pid])
         except Exception as e:
             print(f"[Background Illustration Error]: {e}")
+            publish_illustration_event(pid, "failed", {"detail": "Failed to generate illustration"})
 
-    background_tasks.add_task(background_image_generation, poem_data["body"], poem_id)
     poem_data["similar_poems"] = similar_poems
     poem_data["poem_id"] = poem_id
     
     # Save the user poem to poems.json
     save_user_poem(poem_data, request.prompt)
+
+    # Register the job only once nothing else can fail, so no "queued" history is
+    # left behind without a task to finish it; still before responding, so a
+    # stream opened right away finds it
+    publish_illustration_event(poem_id, "queued")
+    background_tasks.add_task(background_image_generation, poem_data["body"], poem_id)
     
     return GenerateResponse(**poem_data)
 
@@ -223,6 +311,58 @@ async def get_illustration(poem_id: str):
         return {"status": "pending"}
     return {"status": "ready", **ILLUSTRATION_CACHE[poem_id]}
 
+@app.get("/illustration/stream")
+async def stream_illustration(poem_id: str):
+    """Server-Sent Events stream of an illustration job's progress.
+
+    Replays any events already recorded for the job, then pushes new ones as the
+    background task publishes them, closing after "ready" or "failed".
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    subscriber = (loop, queue)
+    with ILLUSTRATION_LOCK:
+        if poem_id in ILLUSTRATION_EVENTS:
+            history = list(ILLUSTRATION_EVENTS[poem_id])
+        elif poem_id in ILLUSTRATION_CACHE:
+            # History was evicted after the job finished; the result is still cached
+            history = [{"event": "ready", "data": ILLUSTRATION_CACHE[poem_id]}]
+        else:
+            raise HTTPException(status_code=404, detail="Unknown poem_id")
+        finished = any(m["event"] in TERMINAL_ILLUSTRATION_EVENTS for m in history)
+        if not finished:
+            ILLUSTRATION_SUBSCRIBERS.setdefault(poem_id, set()).add(subscriber)
+
+    async def event_stream():
+        try:
+            for message in history:
+                yield format_sse(message)
+            if finished:
+                return
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=ILLUSTRATION_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(message)
+                if message["event"] in TERMINAL_ILLUSTRATION_EVENTS:
+                    return
+        finally:
+            with ILLUSTRATION_LOCK:
+                waiting = ILLUSTRATION_SUBSCRIBERS.get(poem_id)
+                if waiting is not None:
+                    waiting.discard(subscriber)
+                    if not waiting:
+                        del ILLUSTRATION_SUBSCRIBERS[poem_id]
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/poems")
 async def get_poems():
     """Get all archive poems"""
@@ -235,6 +375,24 @@ async def get_poems():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to load poems: {str(e)}")
 
+@app.get("/poems/search", response_model=SearchResponse)
+async def search_poems(
+    q: str = "",
+    limit: int = Query(20, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    """Typeahead search over archive titles, signatures and content, newest first within each match type"""
+    total, hits = SEARCH_INDEX.search(q, limit, offset)
+    return SearchResponse(query=q, total=total, hits=hits)
+
+@app.get("/poems/{poem_id}")
+async def get_poem(poem_id: int):
+    """Get a single archive poem from the in-memory index"""
+    poem = SEARCH_INDEX.get(poem_id)
+    if poem is None:
+        raise HTTPException(status_code=404, detail=f"Poem {poem_id} not found")
+    return poem
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
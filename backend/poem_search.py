@@ -0,0 +1,181 @@
+"""
+In-memory search over the poem archive.
+
+Poems are held in an id -> poem map, and two structures, all built once from
+poems.json and updated as poems are added, answer queries:
+- a sorted array of normalized phrases (every word-start within the title and
+  within the signature phrase) searched by prefix with bisect
+- a token index from each word in a poem's title, content and signature phrase
+  to poem ids, with a sorted vocabulary so the last, still-being-typed word
+  matches by prefix
+
+Token posting sets and phrase hits for prefixes up to SHORT_PREFIX_LENGTH
+letters are precomputed, so short typeahead queries don't scan hundreds of
+entries on every keystroke.
+"""
+
+import re
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Set, Tuple
+
+# Ranking tiers for a hit, best first
+TITLE_START = 0
+TITLE_WORD = 1
+SIGNATURE = 2
+CONTENT = 3
+
+# Prefixes this short match so many tokens that their posting sets are precomputed
+SHORT_PREFIX_LENGTH = 3
+
+# The joke in "(J.D. Evans, a pseudonym, is a New Jersey writer who hums
+# Thus Spake Zarathustra to himself ... occasionally.)"
+SIGNATURE_PHRASE = re.compile(r"\bis\s+(.*?)\s*(?:\.\.\.|…|occasionally|\)|$)", re.IGNORECASE)
+
+# Lead-in shared by nearly every signature; it tells no poems apart, so it isn't indexed
+SIGNATURE_BOILERPLATE = re.compile(r"^(?:an? )?(?:south |southern |southern new |new )?jersey writer (?:whose |whos |who |with )?")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop apostrophes and turn other punctuation into spaces"""
+    text = re.sub(r"['’]", "", text.lower())
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+def signature_phrase(signature: str) -> str:
+    """Return the distinguishing part of a signature, normalized and without the writer boilerplate"""
+    match = SIGNATURE_PHRASE.search(signature)
+    phrase = normalize(match.group(1) if match else signature)
+    return SIGNATURE_BOILERPLATE.sub("", phrase)
+
+
+class PoemSearchIndex:
+    def __init__(self, poems: List[dict]):
+        self.poems: Dict[int, dict] = {}
+        # Sorted (phrase, tier, id) entries for prefix lookup
+        self.phrases: List[Tuple[str, int, int]] = []
+        self.tokens: Dict[str, Set[int]] = {}
+        # Sorted list of the keys of self.tokens for prefix lookup
+        self.vocabulary: List[str] = []
+        # Ids of poems with a token starting with each prefix of up to SHORT_PREFIX_LENGTH letters
+        self.short_prefixes: Dict[str, Set[int]] = {}
+        # Best phrase tier per poem id for each phrase prefix of up to SHORT_PREFIX_LENGTH
+        # letters; a key with a trailing space holds prefixes that end a word
+        self.short_phrase_hits: Dict[str, Dict[int, int]] = {}
+
+        entries = []
+        for poem in poems:
+            entries.extend(self._register(poem))
+        self.phrases = sorted(entries)
+        self.vocabulary = sorted(self.tokens)
+
+    def _register(self, poem: dict) -> List[Tuple[str, int, int]]:
+        """Record a poem and its tokens, returning its phrase entries"""
+        poem_id = poem["id"]
+        self.poems[poem_id] = poem
+
+        title = normalize(poem["title"])
+        entries = []
+        if title:
+            entries.append((title, TITLE_START, poem_id))
+            for match in re.finditer(r" ", title):
+                entries.append((title[match.end():], TITLE_WORD, poem_id))
+        phrase = signature_phrase(poem.get("signature", ""))
+        if phrase:
+            entries.append((phrase, SIGNATURE, poem_id))
+            for match in re.finditer(r" ", phrase):
+                entries.append((phrase[match.end():], SIGNATURE, poem_id))
+        for text, tier, _ in entries:
+            for length in range(1, SHORT_PREFIX_LENGTH + 1):
+                keys = [text[:length]]
+                if len(text) <= length or text[length] == " ":
+                    keys.append(text[:length] + " ")
+                for key in keys:
+                    hits = self.short_phrase_hits.setdefault(key, {})
+                    if tier < hits.get(poem_id, CONTENT + 1):
+                        hits[poem_id] = tier
+
+        for token in set(f"{title} {normalize(poem['content'])} {phrase}".split()):
+            self.tokens.setdefault(token, set()).add(poem_id)
+            for length in range(1, SHORT_PREFIX_LENGTH + 1):
+                self.short_prefixes.setdefault(token[:length], set()).add(poem_id)
+        return entries
+
+    def add(self, poem: dict):
+        """Index a newly saved poem"""
+        known = set(self.tokens)
+        for entry in self._register(poem):
+            insort(self.phrases, entry)
+        for token in self.tokens.keys() - known:
+            insort(self.vocabulary, token)
+
+    def get(self, poem_id: int) -> Optional[dict]:
+        return self.poems.get(poem_id)
+
+    def _phrase_hits(self, query: str, complete: bool) -> Dict[int, int]:
+        """
+        Map poem ids to their best tier among phrases starting with the query.
+
+        When complete, the query's last word must end a word in the phrase too.
+        """
+        if len(query) <= SHORT_PREFIX_LENGTH:
+            key = query + " " if complete else query
+            return dict(self.short_phrase_hits.get(key, {}))
+        hits: Dict[int, int] = {}
+        i = bisect_left(self.phrases, (query,))
+        while i < len(self.phrases) and self.phrases[i][0].startswith(query):
+            phrase, tier, poem_id = self.phrases[i]
+            i += 1
+            if complete and len(phrase) > len(query) and phrase[len(query)] != " ":
+                continue
+            if tier < hits.get(poem_id, CONTENT + 1):
+                hits[poem_id] = tier
+        return hits
+
+    def _prefix_ids(self, prefix: str) -> Set[int]:
+        """Ids of poems containing any token that starts with prefix"""
+        if len(prefix) <= SHORT_PREFIX_LENGTH:
+            return self.short_prefixes.get(prefix, set())
+        ids: Set[int] = set()
+        i = bisect_left(self.vocabulary, prefix)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(prefix):
+            ids |= self.tokens[self.vocabulary[i]]
+            i += 1
+        return ids
+
+    def _token_hits(self, query: str, complete: bool) -> Set[int]:
+        """Ids of poems containing every query word, the last one by prefix unless complete"""
+        words = query.split()
+        if complete:
+            sets = [self.tokens.get(word, set()) for word in words]
+        else:
+            sets = [self.tokens.get(word, set()) for word in words[:-1]]
+            sets.append(self._prefix_ids(words[-1]))
+        sets.sort(key=len)
+        ids = set(sets[0])
+        for other in sets[1:]:
+            ids &= other
+        return ids
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[int, List[dict]]:
+        """
+        Return (total hits, one page of {"id", "title"} hits).
+
+        Title matches rank above signature matches, which rank above content
+        matches; ties and the empty query list newest poems first.
+        """
+        normalized = normalize(query)
+        if not normalized:
+            ranked = sorted(self.poems, reverse=True)
+        else:
+            # A trailing space means the user finished typing the last word
+            complete = query != query.rstrip()
+            tiers = self._phrase_hits(normalized, complete)
+            for poem_id in self._token_hits(normalized, complete):
+                tiers.setdefault(poem_id, CONTENT)
+            # Bucket by tier, then newest first within each; cheaper than a keyed sort
+            buckets: List[List[int]] = [[] for _ in range(CONTENT + 1)]
+            for poem_id, tier in tiers.items():
+                buckets[tier].append(poem_id)
+            ranked = [poem_id for bucket in buckets for poem_id in sorted(bucket, reverse=True)]
+        page = ranked[offset:offset + limit]
+        return len(ranked), [{"id": poem_id, "title": self.poems[poem_id]["title"]} for poem_id in page]
@@ -0,0 +1,269 @@
+"""
+Prosody analyser for the poem archive.
+
+Derives a metrical fingerprint for each poem: the U (unstressed) / "/" (stressed)
+pattern of every line, a meter guess and the rhyme scheme. Pronunciations come
+from the CMU Pronouncing Dictionary, with spelling heuristics for words it
+doesn't know (dialect spellings, coinages, typos in the source texts).
+
+Run directly to add fingerprints to an existing poems_with_embeddings.json
+without re-embedding:
+
+    python prosody.py
+"""
+
+import json
+import re
+import string
+from statistics import median
+from typing import List, Optional, Tuple
+
+import pronouncing
+
+# Monosyllables that are normally unstressed in running verse. The CMU dictionary
+# marks every monosyllable as stressed, so these override it.
+FUNCTION_WORDS = {
+    "a", "an", "the", "and", "but", "or", "nor", "for", "so", "yet", "as", "if",
+    "than", "that", "at", "by", "from", "in", "into", "of", "off", "on", "onto",
+    "to", "with", "up", "out", "through", "till", "via", "per",
+    "i", "me", "my", "we", "us", "our", "you", "your", "he", "him", "his", "she",
+    "her", "it", "its", "they", "them", "their", "who", "whom", "whose", "which",
+    "what", "when", "where", "while",
+    "am", "is", "are", "was", "were", "be", "been", "has", "have", "had", "do",
+    "does", "did", "can", "could", "shall", "should", "will", "would", "may",
+    "might", "must", "not", "no",
+    "i'm", "i've", "i'll", "i'd", "it's", "he's", "she's", "we're", "you're",
+    "they're", "that's", "there's", "what's", "don't", "can't", "won't",
+}
+
+# Suffixes that pull stress onto the syllable just before them (nation, public, ability)
+PRE_STRESS_SUFFIXES = ("tion", "sion", "cian", "tious", "cious", "ical", "ity", "ic", "ial", "ian")
+
+# Inflectional and derivational suffixes that never carry stress themselves (walking,
+# quickly, goodness). Ambiguous endings like -y, -er, -en are left to the prefix rule
+# and default, or "away" would scan as "/U".
+UNSTRESSED_SUFFIXES = ("ing", "ed", "est", "ly", "ness", "ful", "less", "ment")
+
+# Prefixes that are usually unstressed in two-syllable words (away, begin, return)
+UNSTRESSED_PREFIXES = ("a", "be", "de", "re", "ex", "in", "con", "com", "pre", "pro", "per", "dis", "mis")
+
+# Repeating units for each meter, stressed syllable marked with "/"
+FEET = {
+    "iambic": "U/",
+    "trochaic": "/U",
+    "anapestic": "UU/",
+    "dactylic": "/UU",
+}
+
+LINE_LENGTHS = {
+    1: "monometer", 2: "dimeter", 3: "trimeter", 4: "tetrameter",
+    5: "pentameter", 6: "hexameter", 7: "heptameter", 8: "octameter",
+}
+
+# Average mismatch per syllable above which the poem is reported as loose/free verse.
+# Calibrated on the archive: about the 87th percentile of best-fit cost per syllable
+# (median 0.12), which flags dialect and free-verse pieces like "Tribute to a 'Subber Code'"
+IRREGULAR_THRESHOLD = 0.18
+
+# Tiny cost for shifting a foot, so an unshifted fit wins ties: every rotation of
+# "U/" is "/U", and without this a trochaic poem would scan as headless iambs
+ROTATION_PENALTY = 1e-6
+
+WORD_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)*")
+VOWEL_GROUPS = re.compile(r"[aeiouy]+")
+
+
+def split_words(line: str) -> List[str]:
+    return WORD_PATTERN.findall(line.lower().replace("’", "'"))
+
+
+def lookup_phones(word: str) -> Optional[str]:
+    """Return the first CMU pronunciation of a word, or None if it isn't in the dictionary"""
+    for candidate in (word, word.replace("'", "")):
+        phones = pronouncing.phones_for_word(candidate)
+        if phones:
+            return phones[0]
+    return None
+
+
+def count_syllables(word: str) -> int:
+    """Estimate syllables from spelling by counting vowel groups"""
+    word = word.replace("'", "")
+    count = len(VOWEL_GROUPS.findall(word))
+    # Silent final e (made, stone) but not a sounded -le (table)
+    if word.endswith("e") and not word.endswith("le") and count > 1:
+        count -= 1
+    # Silent -ed (walked) unless after t or d (wanted)
+    elif word.endswith("ed") and len(word) > 3 and word[-3] not in "td" and count > 1:
+        count -= 1
+    return max(count, 1)
+
+
+def guess_stress(word: str, syllables: int) -> str:
+    """Place the primary stress of a word from its spelling"""
+    if syllables == 1:
+        return "/"
+    for suffix in PRE_STRESS_SUFFIXES:
+        if word.endswith(suffix) and syllables >= 2:
+            # Stress the syllable just before the suffix, which may itself be two syllables (-ity, -ical)
+            stressed = max(syllables - 1 - count_syllables(suffix), 0)
+            return "U" * stressed + "/" + "U" * (syllables - stressed - 1)
+    if syllables == 2:
+        if any(word.endswith(suffix) for suffix in UNSTRESSED_SUFFIXES):
+            return "/U"
+        if any(word.startswith(prefix) and len(word) > len(prefix) + 2 for prefix in UNSTRESSED_PREFIXES):
+            return "U/"
+        return "/U"
+    # Longer words: antepenultimate stress is the common English default
+    stressed = syllables - 3
+    return "U" * stressed + "/" + "U" * (syllables - stressed - 1)
+
+
+def word_stress(word: str) -> Tuple[str, bool]:
+    """
+    Return a word's stress pattern and whether it may flex with the meter.
+
+    Monosyllables are flexible: their stress in verse depends on context.
+    """
+    phones = lookup_phones(word)
+    if phones is not None:
+        digits = pronouncing.stresses(phones)
+        if len(digits) > 2:
+            # Secondary stress counts as a beat in long words (CON-ver-SA-tion)
+            pattern = "".join("/" if d in "12" else "U" for d in digits)
+        else:
+            pattern = "".join("/" if d == "1" else "U" for d in digits)
+    else:
+        pattern = guess_stress(word, count_syllables(word))
+    if not pattern:
+        return "", False
+    if len(pattern) == 1:
+        return ("U" if word in FUNCTION_WORDS else "/"), True
+    return pattern, False
+
+
+def scan_line(line: str) -> Tuple[str, List[bool]]:
+    """Return the stress pattern of a line and which syllables are flexible"""
+    pattern = ""
+    flexible: List[bool] = []
+    for word in split_words(line):
+        stress, is_flexible = word_stress(word)
+        pattern += stress
+        flexible.extend([is_flexible] * len(stress))
+    return pattern, flexible
+
+
+def rhyme_key(line: str) -> Optional[str]:
+    """Return the sound of a line's last word from its last stressed vowel onward"""
+    words = split_words(line)
+    if not words:
+        return None
+    word = words[-1]
+    phones = lookup_phones(word)
+    if phones is not None:
+        # Drop stress digits so "red" and "instead" still match
+        return re.sub(r"\d", "", pronouncing.rhyming_part(phones))
+    word = word.replace("'", "")
+    if word.endswith("e") and len(word) > 2 and not word.endswith("ee"):
+        word = word[:-1]
+    groups = list(VOWEL_GROUPS.finditer(word))
+    if not groups:
+        return word
+    return word[groups[-1].start():]
+
+
+def rhyme_scheme(lines: List[str]) -> str:
+    """Label each line's end sound with a letter, separating stanzas with spaces"""
+    labels = {}
+    letters = string.ascii_uppercase + string.ascii_lowercase
+    stanzas: List[str] = []
+    current = ""
+    for line in lines:
+        key = rhyme_key(line)
+        if key is None:
+            if current:
+                stanzas.append(current)
+                current = ""
+            continue
+        if key not in labels:
+            labels[key] = letters[len(labels)] if len(labels) < len(letters) else "?"
+        current += labels[key]
+    if current:
+        stanzas.append(current)
+    return " ".join(stanzas)
+
+
+def fit_meter(pattern: str, flexible: List[bool], foot: str) -> Tuple[float, int]:
+    """
+    Align a line against a repeating foot and return (mismatch cost, stresses).
+
+    Every rotation of the foot is tried so headless lines and anacrusis still fit.
+    A flexible monosyllable that disagrees with the template costs half as much.
+    """
+    best_cost, best_beats = float("inf"), 0
+    for offset in range(len(foot)):
+        template = (foot[offset:] + foot * len(pattern))[:len(pattern)]
+        cost = offset * ROTATION_PENALTY + sum(
+            (0.5 if flex else 1.0)
+            for actual, expected, flex in zip(pattern, template, flexible)
+            if actual != expected
+        )
+        if cost < best_cost:
+            best_cost, best_beats = cost, template.count("/")
+    return best_cost, best_beats
+
+
+def guess_meter(scanned: List[Tuple[str, List[bool]]]) -> str:
+    """Pick the foot that best fits the poem's lines and name its line length"""
+    scanned = [(p, f) for p, f in scanned if p]
+    if not scanned:
+        return "unknown"
+    total_syllables = sum(len(p) for p, _ in scanned)
+    best_name, best_cost, best_beats = "", float("inf"), []
+    for name, foot in FEET.items():
+        fits = [fit_meter(p, f, foot) for p, f in scanned]
+        cost = sum(c for c, _ in fits)
+        if cost < best_cost:
+            best_name, best_cost, best_beats = name, cost, [b for _, b in fits]
+    beats = int(median(best_beats))
+    meter = f"{best_name} {LINE_LENGTHS.get(beats, f'{beats}-beat')}"
+    if best_cost / total_syllables > IRREGULAR_THRESHOLD:
+        return f"irregular (loosely {meter})"
+    return meter
+
+
+def analyze_poem(content: str) -> dict:
+    """
+    Build the metrical fingerprint of a poem.
+
+    stress_patterns lines up with content.split("\\n"); blank lines scan as "".
+    """
+    lines = content.split("\n")
+    scanned = [scan_line(line) for line in lines]
+    return {
+        "meter": guess_meter(scanned),
+        "rhyme_scheme": rhyme_scheme(lines),
+        "stress_patterns": [pattern for pattern, _ in scanned],
+    }
+
+
+def format_fingerprint(prosody: dict) -> str:
+    """Render a fingerprint as prompt text"""
+    patterns = "\n".join(p for p in prosody["stress_patterns"] if p)
+    return (
+        f"Meter: {prosody['meter']}\n"
+        f"Rhyme scheme: {prosody['rhyme_scheme']}\n"
+        f"Stress pattern:\n{patterns}"
+    )
+
+
+if __name__ == "__main__":
+    with open("poems_with_embeddings.json", "r") as f:
+        poems = json.load(f)
+
+    for poem in poems:
+        poem["prosody"] = analyze_poem(poem["content"])
+
+    with open("poems_with_embeddings.json", "w") as f:
+        json.dump(poems, f)
+    print(f"Added metrical fingerprints to {len(poems)} poems.")
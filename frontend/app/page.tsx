@@ -1,6 +1,6 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import './globals.css'
 
 interface GenerateResponse {
@@ -14,10 +14,24 @@ interface GenerateResponse {
 }
 
 interface IllustrationResponse {
-  status: string
+  illustration_prompt?: string
   illustration_url?: string
 }
 
+interface ArchivePoemHit {
+  id: number
+  title: string
+}
+
+interface SearchResponse {
+  query: string
+  total: number
+  hits: ArchivePoemHit[]
+}
+
+// Number of archive titles fetched per page
+const ARCHIVE_PAGE_SIZE = 50
+
 interface ArchivePoem {
   id: number
   title: string
@@ -30,52 +44,90 @@ export default function Home() {
   const [poem, setPoem] = useState<GenerateResponse | null>(null)
   const [isLoading, setIsLoading] = useState(false)
   const [error, setError] = useState('')
-  const [archivePoems, setArchivePoems] = useState<ArchivePoem[]>([])
+  const [archivePoems, setArchivePoems] = useState<ArchivePoemHit[]>([])
+  const [archiveTotal, setArchiveTotal] = useState(0)
+  const [archiveLoaded, setArchiveLoaded] = useState(false)
+  const [searchQuery, setSearchQuery] = useState('')
   const [selectedArchivePoem, setSelectedArchivePoem] = useState<ArchivePoem | null>(null)
   const [illustrationUrl, setIllustrationUrl] = useState<string | null>(null)
   const [isGeneratingImage, setIsGeneratingImage] = useState(false)
+  const [imageStatus, setImageStatus] = useState('Generating Image...')
+  const illustrationSourceRef = useRef<EventSource | null>(null)
+  const archiveRequestRef = useRef<AbortController | null>(null)
 
-  // Load archive poems on component mount
-  const loadArchivePoems = async () => {
+  // Load one page of archive titles matching the search query (all titles when empty).
+  // Starting a new request aborts the previous one so a slow stale response can't win.
+  const loadArchivePoems = async (query: string, offset: number = 0) => {
+    archiveRequestRef.current?.abort();
+    const controller = new AbortController();
+    archiveRequestRef.current = controller;
     try {
       const apiBaseUrl = process.env.NEXT_PUBLIC_API_URL;
-      const response = await fetch(`${apiBaseUrl}/poems`);
+      const response = await fetch(
+        `${apiBaseUrl}/poems/search?q=${encodeURIComponent(query)}&limit=${ARCHIVE_PAGE_SIZE}&offset=${offset}`,
+        { signal: controller.signal }
+      );
       if (response.ok) {
-        const data = await response.json();
-        setArchivePoems(data.poems || []);
+        const data: SearchResponse = await response.json();
+        const hits = data.hits || [];
+        setArchivePoems((previous) => (offset === 0 ? hits : [...previous, ...hits]));
+        setArchiveTotal(data.total);
+        setArchiveLoaded(true);
       }
     } catch (err) {
-      // fail silently
+      // fail silently (including aborted requests)
     }
   };
 
+  // Debounce typeahead so each keystroke doesn't fire a request
   useEffect(() => {
-    loadArchivePoems();
-  }, []);
+    const timeout = setTimeout(() => loadArchivePoems(searchQuery), 150);
+    return () => clearTimeout(timeout);
+  }, [searchQuery]);
 
-  // Poll for illustration when user clicks generate image button
+  // Abort any in-flight archive request on unmount
+  useEffect(() => () => archiveRequestRef.current?.abort(), []);
+
+  const closeIllustrationStream = () => {
+    illustrationSourceRef.current?.close();
+    illustrationSourceRef.current = null;
+  };
+
+  // Drop any open illustration stream when the poem changes or the page unmounts
+  useEffect(() => closeIllustrationStream, [poem]);
+
+  // Subscribe to the illustration stream when user clicks generate image button
   const startImageGeneration = () => {
     if (!poem?.poem_id) return;
+    closeIllustrationStream();
+    setError('');
+    setImageStatus('Generating Image...');
     setIsGeneratingImage(true);
     setIllustrationUrl(null);
-    const interval = setInterval(async () => {
-      try {
-        const apiBaseUrl = process.env.NEXT_PUBLIC_API_URL;
-        const response = await fetch(`${apiBaseUrl}/illustration?poem_id=${poem.poem_id}`);
-        if (response.ok) {
-          const data: IllustrationResponse = await response.json();
-          if (data.status === "ready") {
-            setIllustrationUrl(data.illustration_url || null);
-            setIsGeneratingImage(false);
-            clearInterval(interval);
-          }
-        }
-      } catch (err) {
-        setIsGeneratingImage(false);
-        clearInterval(interval);
-      }
-    }, 3000);
-    return () => clearInterval(interval);
+    const apiBaseUrl = process.env.NEXT_PUBLIC_API_URL;
+    const source = new EventSource(`${apiBaseUrl}/illustration/stream?poem_id=${poem.poem_id}`);
+    illustrationSourceRef.current = source;
+    source.addEventListener('visual_prompt', () => {
+      setImageStatus('Scene ready, drawing illustration...');
+    });
+    source.addEventListener('ready', (event) => {
+      const data: IllustrationResponse = JSON.parse((event as MessageEvent).data);
+      setIllustrationUrl(data.illustration_url || null);
+      setIsGeneratingImage(false);
+      closeIllustrationStream();
+    });
+    source.addEventListener('failed', (event) => {
+      const data = JSON.parse((event as MessageEvent).data);
+      setError(data.detail || 'Failed to generate illustration');
+      setIsGeneratingImage(false);
+      closeIllustrationStream();
+    });
+    source.onerror = () => {
+      // Also covers the 404 for jobs the server no longer knows about (e.g. after a restart)
+      setError('Lost connection while generating the illustration');
+      setIsGeneratingImage(false);
+      closeIllustrationStream();
+    };
   };
 
   const handleSubmit = async (e: React.FormEvent) => {
@@ -105,7 +157,7 @@ export default function Home() {
       const data: GenerateResponse = await response.json()
       setPoem(data)
       // Reload archive to include the new poem
-      await loadArchivePoems()
+      await loadArchivePoems(searchQuery)
     } catch (err) {
       setError(err instanceof Error ? err.message : 'An error occurred')
     } finally {
@@ -113,12 +165,23 @@ export default function Home() {
     }
   }
 
-  const handleArchivePoemClick = (archivePoem: ArchivePoem) => {
-    setSelectedArchivePoem(archivePoem)
+  const handleArchivePoemClick = async (hit: ArchivePoemHit) => {
     setPoem(null)
     setError('')
     setIllustrationUrl(null)
     setIsGeneratingImage(false)
+    try {
+      const apiBaseUrl = process.env.NEXT_PUBLIC_API_URL;
+      const response = await fetch(`${apiBaseUrl}/poems/${hit.id}`);
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`)
+      }
+      const data: ArchivePoem = await response.json()
+      setSelectedArchivePoem(data)
+    } catch (err) {
+      setSelectedArchivePoem(null)
+      setError(err instanceof Error ? err.message : 'An error occurred')
+    }
   }
 
   const handlePromptKeyDown = (e: React.KeyboardEvent<HTMLTextAreaElement>) => {
@@ -159,22 +222,39 @@ export default function Home() {
           </button>
         </form>
         <div className="archive-container" style={{marginTop: 32}}>
+          <input
+            type="search"
+            className="archive-search"
+            value={searchQuery}
+            onChange={(e) => setSearchQuery(e.target.value)}
+            placeholder="Search the archive..."
+          />
           <div className="archive-list">
             {archivePoems.length === 0 ? (
               <div className="archive-loading">
-                <p>Loading archive poems...</p>
+                <p>{archiveLoaded ? 'No matching poems.' : 'Loading archive poems...'}</p>
               </div>
             ) : (
-              archivePoems.map((archivePoem) => (
-                <div
-                  key={archivePoem.id}
-                  className={`archive-poem-item${selectedArchivePoem?.id === archivePoem.id ? ' selected' : ''}`}
-                  onClick={() => handleArchivePoemClick(archivePoem)}
-                >
-                  <div className="archive-poem-title">{archivePoem.title}</div>
-                  <div className="archive-poem-id">#{archivePoem.id}</div>
-                </div>
-              ))
+              <>
+                {archivePoems.map((archivePoem) => (
+                  <div
+                    key={archivePoem.id}
+                    className={`archive-poem-item${selectedArchivePoem?.id === archivePoem.id ? ' selected' : ''}`}
+                    onClick={() => handleArchivePoemClick(archivePoem)}
+                  >
+                    <div className="archive-poem-title">{archivePoem.title}</div>
+                    <div className="archive-poem-id">#{archivePoem.id}</div>
+                  </div>
+                ))}
+                {archivePoems.length < archiveTotal && (
+                  <button
+                    className="archive-load-more"
+                    onClick={() => loadArchivePoems(searchQuery, archivePoems.length)}
+                  >
+                    Load more ({archiveTotal - archivePoems.length} remaining)
+                  </button>
+                )}
+              </>
             )}
           </div>
         </div>
@@ -214,10 +294,15 @@ export default function Home() {
                   <div className="poem-image-container">
                     <div className="image-generating">
                       <img src="/images/ui/loader.gif" alt="Generating..." className="loading-gif" />
-                      <span>Generating Image...</span>
+                      <span>{imageStatus}</span>
                     </div>
                   </div>
                 )}
+                {error && (
+                  <div className="error">
+                    Error: {error}
+                  </div>
+                )}
               </>
             ) : selectedArchivePoem ? (
               <>